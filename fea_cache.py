@@ -0,0 +1,70 @@
+import os
+from functools import lru_cache
+from fontTools.feaLib.ast import Block, GlyphClassDefinition, GlyphClassName, LookupBlock, PairPosStatement
+from fontTools.feaLib.parser import Parser
+
+def parse_fea(fea_file_path, mtime, glyph_names=frozenset()):
+    """
+    Parses a .fea file and returns the fontTools FeatureFile.
+
+    Results are memoized on (path, mtime, glyph names) so that scripts run in
+    the same process share one parse. Callers pass os.path.getmtime(path) so
+    an edited file is parsed again. The returned FeatureFile is shared and
+    must not be modified.
+    """
+    # lru_cache keys on the arguments exactly as passed, so normalise them first
+    return _parse_fea(os.path.abspath(fea_file_path), mtime, frozenset(glyph_names))
+
+@lru_cache(maxsize=8)
+def _parse_fea(fea_file_path, mtime, glyph_names):
+    with open(fea_file_path, 'r', encoding='utf-8', buffering=1 << 17) as f:
+        parser = Parser(
+            featurefile=f,
+            glyphNames=glyph_names,
+            followIncludes=False # Set to True if your .fea uses 'include' statements.
+        )
+        return parser.parse()
+
+def iter_glyph_class_definitions(feature_file):
+    """
+    Yields every GlyphClassDefinition in feature_file in source order,
+    including those defined inside lookup, feature and table blocks.
+    """
+    # Stack of statement iterators; a block is drained before its parent resumes
+    stack = [iter(feature_file.statements)]
+    while stack:
+        for statement in stack[-1]:
+            if isinstance(statement, GlyphClassDefinition):
+                yield statement
+            elif isinstance(statement, Block):
+                stack.append(iter(statement.statements))
+                break
+        else:
+            stack.pop()
+
+def kern_lookups(feature_file):
+    """
+    Returns the top-level lookups holding kerning rules, i.e. those whose
+    name starts with 'kern' (case-insensitive).
+    """
+    return [
+        statement for statement in feature_file.statements
+        if isinstance(statement, LookupBlock) and statement.name[:4].lower() == 'kern'
+    ]
+
+def kerning_group_prefixes(feature_file):
+    """
+    Maps each class that kerning refers to symbolically to the UFO group
+    prefixes it is used under: 'public.kern1.' on the first side of a pair,
+    'public.kern2.' on the second. Classes in 'enum pos' rules are expanded
+    to glyphs, so they are not counted.
+    """
+    prefixes = {}
+    for lookup_block in kern_lookups(feature_file):
+        for statement in lookup_block.statements:
+            if type(statement) is not PairPosStatement or getattr(statement, 'enumerated', False):
+                continue
+            for group, prefix in ((statement.glyphs1, 'public.kern1.'), (statement.glyphs2, 'public.kern2.')):
+                if isinstance(group, GlyphClassName):
+                    prefixes.setdefault(group.glyphclass.name, set()).add(prefix)
+    return prefixes
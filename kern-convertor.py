@@ -1,100 +1,186 @@
 import os
 import argparse
-from fontTools.feaLib.parser import Parser
+from collections import defaultdict
+from functools import lru_cache
 # Corrected import: Removed GlyphList as it's not a direct importable member of feaLib.ast
-from fontTools.feaLib.ast import FeatureFile, LookupBlock, ValueRecord, Anchor, MarkBasePosStatement, MarkMarkPosStatement, PairPosStatement, GlyphClassDefinition, GlyphName, GlyphClass # Added GlyphClass for explicit type checking
+from fontTools.feaLib.ast import FeatureFile, ValueRecord, Anchor, MarkBasePosStatement, MarkMarkPosStatement, PairPosStatement, GlyphName, GlyphClassName
 from fontTools.ttLib import TTFont
-import plistlib
 import logging
+from fea_cache import parse_fea, iter_glyph_class_definitions, kern_lookups
+from plist_writer import write_plist
 
 # Set up logging for better feedback
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
+# Sentinel for getattr lookups where None could be a real attribute value
+_MISSING = object()
+
 def get_all_glyph_names_from_font(font_path):
     """
     Extracts all glyph names from a given font file.
+    Results are cached per (path, mtime), so an unchanged font is read only once.
     """
     try:
-        font = TTFont(font_path)
-        glyph_names = set(font.getGlyphOrder())
-        font.close()
-        return glyph_names
+        return _read_glyph_names(font_path, os.path.getmtime(font_path))
     except Exception as e:
         logging.error(f"Failed to read glyph names from font '{font_path}': {e}")
         return None
 
+@lru_cache(maxsize=4)
+def _read_glyph_names(font_path, mtime):
+    # Exceptions propagate so that failures are reported by the caller and never cached
+    # Lazy loading defers table decompilation; the glyph order only needs 'maxp' and 'post'
+    font = TTFont(font_path, lazy=True, recalcBBoxes=False, recalcTimestamp=False)
+    try:
+        return frozenset(font.getGlyphOrder())
+    finally:
+        font.close()
+
+def _glyph_names_from_items(items):
+    """
+    Convert a sequence of glyph items to their FEA string representation.
+    """
+    if not items:
+        return []
+    # Items within a group are almost always of one type, so bind asFea once
+    as_fea = getattr(type(items[0]), 'asFea', None)
+    try:
+        if as_fea is not None:
+            return [as_fea(g) for g in items]
+        return [str(g) for g in items]
+    except (AttributeError, TypeError):
+        # Mixed item types: fall back to per-item dispatch
+        names = []
+        for g in items:
+            item_as_fea = getattr(g, 'asFea', _MISSING)
+            names.append(str(g) if item_as_fea is _MISSING else item_as_fea())
+        return names
+
 def extract_glyph_names_from_group(group):
     """
     Extract glyph names from a glyph group object.
     """
-    resolved_glyphs = []
-    
-    if hasattr(group, 'as_list'):
-        resolved_glyphs = [g.asFea() if hasattr(g, 'asFea') else str(g) for g in group.as_list]
-    elif hasattr(group, 'glyphs'):
-        resolved_glyphs = [g.asFea() if hasattr(g, 'asFea') else str(g) for g in group.glyphs]
-    elif isinstance(group, GlyphName):
-        resolved_glyphs = [group.asFea()]
-    elif hasattr(group, '__iter__') and not isinstance(group, str):
-        resolved_glyphs = [g.asFea() if hasattr(g, 'asFea') else str(g) for g in group]
-    elif hasattr(group, 'asFea'):
-        resolved_glyphs = [group.asFea()]
-    else:
-        logging.warning(f"Unexpected group structure: {type(group)}")
-    
-    return resolved_glyphs
+    try:
+        items = group.as_list
+    except AttributeError:
+        try:
+            items = group.glyphs
+        except AttributeError:
+            if isinstance(group, GlyphName):
+                return [group.asFea()]
+            if isinstance(group, str) or getattr(group, '__iter__', _MISSING) is _MISSING:
+                try:
+                    return [group.asFea()]
+                except AttributeError:
+                    logging.warning(f"Unexpected group structure: {type(group)}")
+                    return []
+            items = list(group)
 
-def extract_glyphs_from_glyphclass(glyph_class, glyph_classes_dict):
+    return _glyph_names_from_items(items)
+
+def extract_glyphs_from_glyphclass(glyph_class):
     """
-    Recursively extract glyph names from a GlyphClass object.
+    Extract glyph names from a GlyphClassDefinition or GlyphClass object.
+    feaLib expands nested class references at parse time, and glyphSet()
+    also follows alias definitions such as '@B = @A;'.
     """
-    member_glyphs = []
-    
-    # Check if glyph_class has glyphs attribute
-    if hasattr(glyph_class, 'glyphs'):
-        glyphs_list = glyph_class.glyphs
-        # Handle different possible structures
-        if hasattr(glyphs_list, 'glyphs'):
-            # It's a GlyphClass with nested glyphs
-            items = glyphs_list.glyphs
-        elif hasattr(glyphs_list, '__iter__'):
-            # It's directly iterable
-            items = glyphs_list
-        else:
-            logging.warning(f"Unexpected glyph class structure: {type(glyphs_list)}")
-            return []
-    else:
-        logging.warning(f"GlyphClass object has no 'glyphs' attribute: {glyph_class}")
+    try:
+        return list(glyph_class.glyphSet())
+    except AttributeError:
+        logging.warning(f"Unexpected glyph class structure: {type(glyph_class)}")
         return []
-    
-    for item in items:
-        if isinstance(item, GlyphName):
-            # If it's an individual glyph name, add its string representation
-            member_glyphs.append(item.asFea())
-        elif isinstance(item, GlyphClass):
-            # If it's a nested glyph class, try to expand it
-            nested_class_name = item.asFea()
-            if nested_class_name in glyph_classes_dict:
-                member_glyphs.extend(glyph_classes_dict[nested_class_name])
-                logging.debug(f"Expanded nested class '{nested_class_name}'.")
+
+def _class_members(class_ref):
+    """
+    Return the glyphs of the class a GlyphClassName refers to.
+    glyphSet() follows alias definitions such as '@B = @A;'.
+    """
+    return list(class_ref.glyphclass.glyphSet())
+
+def _handle_pair_pos(statement, kerning_data):
+    """
+    Adds the kerning pairs of a single PairPosStatement to kerning_data.
+    """
+    try:
+        # PairPosStatement attributes are different - they use 'glyphs1' and 'glyphs2'
+        first_group = getattr(statement, 'glyphs1', None) or getattr(statement, 'firstGlyphs', None)
+        second_group = getattr(statement, 'glyphs2', None) or getattr(statement, 'secondGlyphs', None)
+        
+        if first_group is None or second_group is None:
+            logging.warning(f"Could not find glyph groups in PairPosStatement: {statement}")
+            return
+        
+        value = 0
+        for value_record in (getattr(statement, 'valuerecord1', None), getattr(statement, 'value1', None)):
+            if value_record:
+                x_advance = getattr(value_record, 'xAdvance', None)
+                if x_advance is not None:
+                    value = x_advance
+                    break
+        
+        # 'enum pos' rules must be flattened to individual glyph pairs
+        enumerated = getattr(statement, 'enumerated', False)
+
+        # Resolve first group (kerning group reference or individual glyphs)
+        resolved_first_glyphs = []
+        if isinstance(first_group, GlyphClassName):
+            # The reference holds its definition, which may be local to a block
+            class_name = first_group.glyphclass.name
+            if enumerated:
+                resolved_first_glyphs = _class_members(first_group)
             else:
-                logging.warning(f"Nested glyph class '{nested_class_name}' not yet defined. Adding class name directly.")
-                member_glyphs.append(nested_class_name)
-        elif isinstance(item, str):
-            # Handle string glyph names directly
-            member_glyphs.append(item)
-        elif hasattr(item, 'asFea'):
-            # Generic handling for other AST nodes that can be converted to FEA syntax
-            member_glyphs.append(item.asFea())
+                # Keep the class symbolic: UFO kerning accepts group names as keys
+                resolved_first_glyphs = ['public.kern1.' + class_name]
         else:
-            logging.warning(f"Unknown item type {type(item).__name__} in glyph class. Skipping.")
-    
-    return member_glyphs
+            # Handle different possible structures for first_group
+            resolved_first_glyphs = extract_glyph_names_from_group(first_group)
+
+        # Resolve second group (kerning group reference or individual glyphs)
+        resolved_second_glyphs = []
+        if isinstance(second_group, GlyphClassName):
+            # The reference holds its definition, which may be local to a block
+            class_name = second_group.glyphclass.name
+            if enumerated:
+                resolved_second_glyphs = _class_members(second_group)
+            else:
+                # Keep the class symbolic: UFO kerning accepts group names as keys
+                resolved_second_glyphs = ['public.kern2.' + class_name]
+        else:
+            # Handle different possible structures for second_group
+            resolved_second_glyphs = extract_glyph_names_from_group(second_group)
+
+        # Generate the kerning pairs
+        if not resolved_second_glyphs:
+            return
+        # Every first glyph gets the same row, so build it once and merge it in bulk
+        second_row = dict.fromkeys(resolved_second_glyphs, value)
+        for g1 in resolved_first_glyphs:
+            kerning_data[g1].update(second_row)
+            logging.debug("Added kerning pairs: %s %s %s", g1, resolved_second_glyphs, value)
+
+    except AttributeError as ae:
+        logging.warning(f"Could not extract kerning from statement due to missing attribute ({ae}): {statement}. Skipping.")
+    except Exception as ex:
+        logging.warning(f"Generic error processing PairPosStatement {statement}: {ex}. Skipping.")
+
+def _skip_mark_pos(statement, *args):
+    # These are typically for mark positioning, not direct kerning.
+    logging.debug("Skipping mark positioning statement type: %s", type(statement).__name__)
+
+# Dispatch on the exact statement type: one dict lookup instead of an isinstance chain
+_STATEMENT_HANDLERS = {
+    PairPosStatement: _handle_pair_pos,
+    MarkBasePosStatement: _skip_mark_pos,
+    MarkMarkPosStatement: _skip_mark_pos,
+}
 
-def convert_kerning_fea_to_plist(fea_file_path, output_plist_path, font_path=None):
+def convert_kerning_fea_to_plist(fea_file_path, output_plist_path, font_path=None, validate_glyphs=True, binary=False):
     """
     Converts kerning rules from a .fea file to a kerning.plist format.
-    Handles class-based kerning by expanding classes.
+    Named classes are kept as UFO kerning groups (public.kern1./public.kern2.);
+    only 'enum pos' rules are expanded into individual glyph pairs.
+    With validate_glyphs=False the font is not opened and the parser gets no glyph set.
+    With binary=True the plist is written in binary format.
     """
     logging.info(f"Attempting to convert '{fea_file_path}' to '{output_plist_path}'...")
 
@@ -103,7 +189,9 @@ def convert_kerning_fea_to_plist(fea_file_path, output_plist_path, font_path=Non
         return
 
     all_glyph_names = None
-    if font_path:
+    if font_path and not validate_glyphs:
+        logging.info("Glyph validation disabled. Skipping font file.")
+    elif font_path:
         logging.info(f"Checking for input font file: '{font_path}'")
         if not os.path.exists(font_path):
             logging.warning(f"Font file not found: '{font_path}'. Proceeding without glyph set validation. This might lead to unexpected parsing issues if glyphs are not recognized.")
@@ -112,119 +200,47 @@ def convert_kerning_fea_to_plist(fea_file_path, output_plist_path, font_path=Non
             if all_glyph_names is None:
                 logging.warning("Could not retrieve glyph names from font. Proceeding without glyph set for parser.")
     
-    # If font_path was not provided or failed, provide an empty set
+    # If font_path was not provided or failed, provide an empty frozenset
     if all_glyph_names is None:
         logging.info("Proceeding without a pre-defined glyph set for the parser. Parser will infer glyphs from the .fea file.")
-        all_glyph_names = set()
+        all_glyph_names = frozenset()
 
     feature_file = None
     try:
         logging.info("Parsing .fea file...")
-        with open(fea_file_path, 'r', encoding='utf-8') as f:
-            parser = Parser(
-                featurefile=f,
-                glyphNames=all_glyph_names,
-                followIncludes=False # Set to True if your .fea uses 'include' statements.
-            )
-            feature_file = parser.parse()
+        feature_file = parse_fea(fea_file_path, os.path.getmtime(fea_file_path), all_glyph_names)
         logging.info("Finished parsing .fea file.")
 
     except Exception as e:
         logging.error(f"Error parsing .fea file: {e}")
         return
 
-    # --- Store Glyph Class Definitions ---
-    glyph_classes = {} # Stores {'@ClassName': ['glyph1', 'glyph2', ...]}
+    # --- Report Glyph Class Definitions ---
+    # Kerning rules resolve classes from their own references, so nothing is stored here
     if feature_file:
-        for statement in feature_file.statements:
-            if isinstance(statement, GlyphClassDefinition):
-                class_name = statement.name
-                
-                # Use the helper function to extract glyphs
-                member_glyphs = extract_glyphs_from_glyphclass(statement, glyph_classes)
-                
-                glyph_classes[class_name] = member_glyphs
-                logging.info(f"Identified glyph class: {class_name} with {len(member_glyphs)} members.")
+        for statement in iter_glyph_class_definitions(feature_file):
+            # Use the helper function to extract glyphs
+            member_glyphs = extract_glyphs_from_glyphclass(statement)
+            logging.info(f"Identified glyph class: {statement.name} with {len(member_glyphs)} members.")
     # --- End New Logic ---
 
-    # Initialize a dictionary for kerning
-    kerning_data = {}
+    # Initialize a dictionary for kerning, creating each first-glyph row on demand
+    kerning_data = defaultdict(dict)
 
     if feature_file:
-        # Iterate through all lookup blocks in the parsed feature file
-        for lookup_block in feature_file.statements:
-            # We are interested in `lookup_block`s as well as direct `feature` blocks
-            # Feature blocks themselves contain statements, but for kerning, we often find PairPosStatements
-            # inside LookupBlocks that are then referenced by a feature.
-            # We must iterate through all top-level statements, and if they are Lookups, then their statements.
-            
-            statements_to_process = []
-            if isinstance(lookup_block, LookupBlock) and lookup_block.name.lower().startswith('kern'):
-                logging.info(f"Processing kerning lookup: {lookup_block.name}")
-                statements_to_process = lookup_block.statements
-            # Add logic here if kerning rules are directly under a 'feature kern' block
-            # This current structure assumes PairPosStatement inside LookupBlocks.
+        # Kerning rules are PairPosStatements inside LookupBlocks whose name starts with 'kern',
+        # which are then referenced by a feature. Select those lookups once up front.
+        # Add logic here if kerning rules are directly under a 'feature kern' block
+        for lookup_block in kern_lookups(feature_file):
+            logging.info(f"Processing kerning lookup: {lookup_block.name}")
+            statements_to_process = lookup_block.statements
 
             for statement in statements_to_process:
-                if isinstance(statement, PairPosStatement):
-                    try:
-                        # PairPosStatement attributes are different - they use 'glyphs1' and 'glyphs2'
-                        first_group = getattr(statement, 'glyphs1', None) or getattr(statement, 'firstGlyphs', None)
-                        second_group = getattr(statement, 'glyphs2', None) or getattr(statement, 'secondGlyphs', None)
-                        
-                        if first_group is None or second_group is None:
-                            logging.warning(f"Could not find glyph groups in PairPosStatement: {statement}")
-                            continue
-                        
-                        value = 0
-                        if hasattr(statement, 'valuerecord1') and statement.valuerecord1 and statement.valuerecord1.xAdvance is not None:
-                            value = statement.valuerecord1.xAdvance
-                        elif hasattr(statement, 'value1') and statement.value1 and statement.value1.xAdvance is not None:
-                            value = statement.value1.xAdvance
-                        
-                        # Resolve first group (individual glyphs or expanded class)
-                        resolved_first_glyphs = []
-                        if hasattr(first_group, 'is_class') and first_group.is_class:
-                            class_name = first_group.asFea()
-                            resolved_first_glyphs = glyph_classes.get(class_name, [])
-                            if not resolved_first_glyphs:
-                                logging.warning(f"Class '{class_name}' used in kerning but not defined. Skipping kerning for this class.")
-                                continue
-                        else:
-                            # Handle different possible structures for first_group
-                            resolved_first_glyphs = extract_glyph_names_from_group(first_group)
-
-                        # Resolve second group (individual glyphs or expanded class)
-                        resolved_second_glyphs = []
-                        if hasattr(second_group, 'is_class') and second_group.is_class:
-                            class_name = second_group.asFea()
-                            resolved_second_glyphs = glyph_classes.get(class_name, [])
-                            if not resolved_second_glyphs:
-                                logging.warning(f"Class '{class_name}' used in kerning but not defined. Skipping kerning for this class.")
-                                continue
-                        else:
-                            # Handle different possible structures for second_group
-                            resolved_second_glyphs = extract_glyph_names_from_group(second_group)
-
-                        # Generate all individual kerning pairs
-                        for g1 in resolved_first_glyphs:
-                            for g2 in resolved_second_glyphs:
-                                if g1 not in kerning_data:
-                                    kerning_data[g1] = {}
-                                kerning_data[g1][g2] = value
-                                logging.debug(f"Added kerning pair: {g1} {g2} {value}")
-
-                    except AttributeError as ae:
-                        logging.warning(f"Could not extract kerning from statement due to missing attribute ({ae}): {statement}. Skipping.")
-                        continue
-                    except Exception as ex:
-                        logging.warning(f"Generic error processing PairPosStatement {statement}: {ex}. Skipping.")
-                        continue
-                elif isinstance(statement, (MarkBasePosStatement, MarkMarkPosStatement)):
-                    # These are typically for mark positioning, not direct kerning.
-                    logging.debug(f"Skipping mark positioning statement type: {type(statement).__name__}")
+                handler = _STATEMENT_HANDLERS.get(type(statement))
+                if handler is not None:
+                    handler(statement, kerning_data)
                 else:
-                    logging.debug(f"Skipping non-PairPosStatement type in kern lookup: {type(statement).__name__}")
+                    logging.debug("Skipping non-PairPosStatement type in kern lookup: %s", type(statement).__name__)
 
     if not kerning_data:
         logging.warning("No kerning data extracted from .fea file. Output plist will be empty.")
@@ -234,8 +250,7 @@ def convert_kerning_fea_to_plist(fea_file_path, output_plist_path, font_path=Non
 
     try:
         # Save the kerning data to a .plist file
-        with open(output_plist_path, 'wb') as fp:
-            plistlib.dump(kerning_data, fp)
+        write_plist(dict(kerning_data), output_plist_path, binary=binary)
         logging.info(f"Successfully converted kerning to '{output_plist_path}'")
     except Exception as e:
         logging.error(f"Error writing to plist file '{output_plist_path}': {e}")
@@ -246,10 +261,12 @@ def main():
     parser.add_argument("fea_file", help="Path to the input .fea file.")
     parser.add_argument("output_plist", help="Path to the output .plist file (e.g., kerning.plist).")
     parser.add_argument("--font", help="Optional: Path to the font file (.ttf, .otf) to extract glyph names for parser validation.", default=None)
+    parser.add_argument("--no-validate", action="store_true", help="Skip reading glyph names from --font and parse without a glyph set.")
+    parser.add_argument("--binary", action="store_true", help="Write a binary plist (faster and smaller, but not valid in a UFO).")
 
     args = parser.parse_args()
 
-    convert_kerning_fea_to_plist(args.fea_file, args.output_plist, args.font)
+    convert_kerning_fea_to_plist(args.fea_file, args.output_plist, args.font, validate_glyphs=not args.no_validate, binary=args.binary)
 
 if __name__ == "__main__":
     main()
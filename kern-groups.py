@@ -1,9 +1,22 @@
 import os
 import sys
-import plistlib
+import mmap
+import logging
 import re
+from functools import lru_cache
+from plist_writer import write_plist
 
-def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str):
+# Regex pattern to match class definitions like:
+# @class_name = [glyph1 glyph2 glyph3];
+# The negated class cannot backtrack past ']', so matching stays linear.
+_CLASS_RE = re.compile(rb'@(\w+)\s*=\s*\[([^\]]*)\]\s*;')
+
+# Common patterns for left-side (kern1) groups
+_LEFT_RE = re.compile(r'LEFT|LHS|L_|FIRST|1ST|_L|L\.')
+# Common patterns for right-side (kern2) groups
+_RIGHT_RE = re.compile(r'RIGHT|RHS|R_|SECOND|2ND|_R|R\.')
+
+def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str, binary: bool = False):
     """
     Extracts kerning groups (glyph class definitions) from a features.fea file
     and writes them to a groups.plist file in UFO format.
@@ -11,6 +24,7 @@ def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str)
     Args:
         fea_file_path (str): The path to the input features.fea file.
         output_plist_path (str): The path where the groups.plist file will be written.
+        binary (bool): Write a binary plist instead of XML.
     """
     if not os.path.exists(fea_file_path):
         print(f"Error: Input features.fea file not found at '{fea_file_path}'")
@@ -19,42 +33,40 @@ def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str)
     print(f"Reading features from: {fea_file_path}")
     
     try:
-        # First try with fontTools Parser
+        # First try with the shared fontTools parse
         try:
-            from fontTools.feaLib.parser import Parser
-            
-            # Read the content of the features.fea file
-            with open(fea_file_path, 'r', encoding='utf-8') as f:
-                fea_content = f.read()
+            from fea_cache import parse_fea, iter_glyph_class_definitions, kerning_group_prefixes
 
-            # Initialize parser correctly for fontTools 4.x
-            # The signature is Parser(text, glyphNames=None, followIncludes=True, **kwargs)
-            parser = Parser(fea_content, glyphNames=set(), followIncludes=False)
-            parser.parse()
+            feature_file = parse_fea(fea_file_path, os.path.getmtime(fea_file_path), frozenset())
 
             extracted_groups_data = {}
 
-            # Check if glyphClassDefs exists and has content
-            if hasattr(parser, 'glyphClassDefs') and parser.glyphClassDefs:
-                print(f"Found {len(parser.glyphClassDefs)} glyph class definitions")
+            glyph_class_defs = list(iter_glyph_class_definitions(feature_file))
+            # Sides each class is kerned on, so group names match kern-convertor.py
+            group_prefixes = kerning_group_prefixes(feature_file)
+
+            # Check if there are any glyph class definitions
+            if glyph_class_defs:
+                print(f"Found {len(glyph_class_defs)} glyph class definitions")
                 
                 # Iterate through the parsed glyph class definitions
-                for class_name, glyph_class_def in parser.glyphClassDefs.items():
+                for glyph_class_def in glyph_class_defs:
+                    class_name = glyph_class_def.name
                     # Remove '@' prefix if present
                     clean_name = class_name[1:] if class_name.startswith('@') else class_name
                     
-                    # Extract glyph names
-                    if hasattr(glyph_class_def, 'glyphs'):
-                        glyph_list = [g.name.lstrip("\\") if hasattr(g, 'name') else str(g).lstrip("\\") for g in glyph_class_def.glyphs]
-                    else:
-                        glyph_list = list(glyph_class_def)
-
-                    # Determine kern1 or kern2 based on naming conventions
-                    ufo_group_name_prefix = determine_group_type(clean_name)
-                    full_ufo_group_name = ufo_group_name_prefix + clean_name
-                    
-                    extracted_groups_data[full_ufo_group_name] = glyph_list
-                    print(f"  Extracted group: {full_ufo_group_name} -> {glyph_list}")
+                    # Extract glyph names; feaLib has already removed any leading backslash
+                    glyph_list = list(glyph_class_def.glyphSet())
+
+                    # Use the side(s) the class is kerned on; a class used on both
+                    # sides gets both a kern1 and a kern2 group. Classes not used in
+                    # kerning fall back to naming conventions.
+                    ufo_group_name_prefixes = group_prefixes.get(class_name) or (determine_group_type(clean_name),)
+                    for ufo_group_name_prefix in sorted(ufo_group_name_prefixes):
+                        full_ufo_group_name = ufo_group_name_prefix + clean_name
+                        
+                        extracted_groups_data[full_ufo_group_name] = glyph_list
+                        logging.debug("  Extracted group: %s -> %s", full_ufo_group_name, glyph_list)
             else:
                 print("No glyph class definitions found with fontTools parser, trying regex fallback...")
                 raise Exception("No glyphClassDefs found")
@@ -71,8 +83,7 @@ def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str)
             return
 
         # Write the groups data directly to a plist file
-        with open(output_plist_path, 'wb') as plist_file:
-            plistlib.dump(extracted_groups_data, plist_file)
+        write_plist(extracted_groups_data, output_plist_path, binary=binary)
         
         print(f"Successfully wrote {len(extracted_groups_data)} kerning groups to: {output_plist_path}")
 
@@ -81,24 +92,18 @@ def extract_and_write_kerning_groups(fea_file_path: str, output_plist_path: str)
         import traceback
         traceback.print_exc()
 
+@lru_cache(maxsize=None)
 def determine_group_type(class_name):
     """Determine if a group should be kern1 or kern2 based on naming conventions."""
     class_name_upper = class_name.upper()
     
-    # Common patterns for left-side (kern1) groups
-    left_patterns = ['LEFT', 'LHS', 'L_', 'FIRST', '1ST', '_L', 'L.']
-    # Common patterns for right-side (kern2) groups  
-    right_patterns = ['RIGHT', 'RHS', 'R_', 'SECOND', '2ND', '_R', 'R.']
-    
     # Check for right-side patterns first (more specific)
-    for pattern in right_patterns:
-        if pattern in class_name_upper or class_name_upper.startswith('R'):
-            return 'public.kern2.'
+    if _RIGHT_RE.search(class_name_upper) or class_name_upper[:1] == 'R':
+        return 'public.kern2.'
     
     # Check for left-side patterns
-    for pattern in left_patterns:
-        if pattern in class_name_upper or class_name_upper.startswith('L'):
-            return 'public.kern1.'
+    if _LEFT_RE.search(class_name_upper) or class_name_upper[:1] == 'L':
+        return 'public.kern1.'
     
     # Default to kern1 if no clear indication
     return 'public.kern1.'
@@ -107,42 +112,48 @@ def parse_groups_with_regex(fea_file_path):
     """Fallback regex-based parser for .fea files."""
     extracted_groups_data = {}
     
-    with open(fea_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Regex pattern to match class definitions like:
-    # @class_name = [glyph1 glyph2 glyph3];
-    class_pattern = r'@(\w+)\s*=\s*\[(.*?)\]\s*;'
-    
-    matches = re.findall(class_pattern, content, re.DOTALL)
-    
-    for class_name, glyphs_str in matches:
-        # Split glyph names and clean them
-        glyph_list = [glyph.strip() for glyph in glyphs_str.split() if glyph.strip()]
-        
-        if glyph_list:  # Only add non-empty groups
-            ufo_group_name_prefix = determine_group_type(class_name)
-            full_ufo_group_name = ufo_group_name_prefix + class_name
-            extracted_groups_data[full_ufo_group_name] = glyph_list
-            print(f"  Extracted group (regex): {full_ufo_group_name} -> {glyph_list}")
+    with open(fea_file_path, 'rb', buffering=1 << 17) as f:
+        try:
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            return extracted_groups_data
+
+        with content:
+            for match in _CLASS_RE.finditer(content):
+                class_name = match.group(1).decode('utf-8')
+                # bytes.split() drops surrounding whitespace, so no strip is needed
+                glyph_list = [glyph.decode('utf-8') for glyph in match.group(2).split()]
+                
+                if glyph_list:  # Only add non-empty groups
+                    ufo_group_name_prefix = determine_group_type(class_name)
+                    full_ufo_group_name = ufo_group_name_prefix + class_name
+                    extracted_groups_data[full_ufo_group_name] = glyph_list
+                    logging.debug("  Extracted group (regex): %s -> %s", full_ufo_group_name, glyph_list)
     
     return extracted_groups_data
 
 def main():
     # Handle command line arguments
-    if len(sys.argv) == 3:
-        input_fea_file = sys.argv[1]
-        output_plist_file = sys.argv[2]
-    elif len(sys.argv) == 1:
+    args = sys.argv[1:]
+    binary = '--binary' in args
+    if binary:
+        args.remove('--binary')
+
+    if len(args) == 2:
+        input_fea_file = args[0]
+        output_plist_file = args[1]
+    elif len(args) == 0:
         # Default values when no arguments provided
         input_fea_file = 'features.fea'
         output_plist_file = 'groups.plist'
     else:
-        print("Usage: python kern-groups.py [input.fea] [output.plist]")
+        print("Usage: python kern-groups.py [--binary] [input.fea] [output.plist]")
         print("   or: python kern-groups.py  (uses default features.fea and groups.plist)")
+        print("  --binary  write a binary plist (faster and smaller, but not valid in a UFO)")
         sys.exit(1)
     
-    extract_and_write_kerning_groups(input_fea_file, output_plist_file)
+    extract_and_write_kerning_groups(input_fea_file, output_plist_file, binary)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+import os
+import plistlib
+
+def write_plist(data, output_plist_path, binary=False):
+    """
+    Writes data to output_plist_path as a plist.
+
+    The plist is serialized in memory with plistlib.dumps and handed to the
+    kernel with os.write, rather than through many small buffered writes.
+    Keys are written in insertion order. With binary=True the plist is
+    written in binary format, which is smaller and faster to produce but
+    not valid inside a UFO.
+    """
+    fmt = plistlib.FMT_BINARY if binary else plistlib.FMT_XML
+    payload = plistlib.dumps(data, fmt=fmt, sort_keys=False)
+    fd = os.open(output_plist_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            # os.write may write fewer bytes than requested (always for > 2 GiB on Linux)
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
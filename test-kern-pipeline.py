@@ -0,0 +1,67 @@
+import os
+import sys
+import plistlib
+import tempfile
+import importlib.util
+
+# Make the shared modules importable when run from another directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+import fea_cache
+
+def load_script(file_name, module_name):
+    # The scripts have hyphenated names, so they cannot be imported directly
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(script_dir, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+kern_groups = load_script('kern-groups.py', 'kern_groups')
+kern_convertor = load_script('kern-convertor.py', 'kern_convertor')
+
+# Dummy .fea content for testing
+dummy_fea_content = """
+@RightRound = [o c e];
+@A_LC = [a aacute];
+@Both = [T V];
+lookup kernTest {
+    pos @RightRound @A_LC -10;
+    pos @Both @Both -30;
+} kernTest;
+"""
+
+failed = False
+with tempfile.TemporaryDirectory() as tmp_dir:
+    fea_path = os.path.join(tmp_dir, "dummy.fea")
+    with open(fea_path, 'w', encoding='utf-8') as f:
+        f.write(dummy_fea_content)
+
+    # Run both steps in one process, as a build pipeline would
+    kern_groups.extract_and_write_kerning_groups(fea_path, os.path.join(tmp_dir, "groups.plist"))
+    kern_convertor.convert_kerning_fea_to_plist(fea_path, os.path.join(tmp_dir, "kerning.plist"))
+
+    with open(os.path.join(tmp_dir, "groups.plist"), 'rb') as fp:
+        groups = plistlib.load(fp)
+    with open(os.path.join(tmp_dir, "kerning.plist"), 'rb') as fp:
+        kerning = plistlib.load(fp)
+
+    # Every kerning group used in kerning.plist must be defined in groups.plist
+    used_groups = set()
+    for first, row in kerning.items():
+        used_groups.update(name for name in (first, *row) if name.startswith(('public.kern1.', 'public.kern2.')))
+    missing_groups = sorted(used_groups.difference(groups))
+    if used_groups and not missing_groups:
+        print("SUCCESS: Every kerning group is defined in groups.plist.")
+    else:
+        print(f"ERROR: Kerning groups missing from groups.plist: {missing_groups or 'no groups used'}")
+        failed = True
+
+    cache_info = fea_cache._parse_fea.cache_info()
+    if cache_info.misses == 1 and cache_info.hits == 1:
+        print("SUCCESS: Both scripts shared one parse of the .fea file.")
+    else:
+        print(f"ERROR: Expected one shared parse, got {cache_info}.")
+        failed = True
+
+sys.exit(1 if failed else 0)
@@ -1,16 +1,14 @@
+import io
 import os
 import inspect # Import the inspect module
 from fontTools.feaLib.parser import Parser
 
-# Create a dummy .fea file for testing
+# Dummy .fea content for testing, parsed from memory rather than a file on disk
 dummy_fea_content = """
 feature kern {
     pos A V -50;
 } kern;
 """
-dummy_fea_path = "dummy.fea"
-with open(dummy_fea_path, 'w', encoding='utf-8') as f:
-    f.write(dummy_fea_content)
 
 print(f"Testing Parser with glyphSet in {os.getcwd()}")
 print(f"FontTools Parser location: {inspect.getfile(Parser)}") # Added for debug
@@ -31,11 +29,12 @@ try:
         print(f"Could not inspect Parser signature: {sig_e}")
     # --- End inspect ---
 
-    with open(dummy_fea_path, 'r', encoding='utf-8') as f:
-        parser = Parser(f, dummy_fea_path, glyphSet=test_glyph_set, followIncludes=False)
-        print("SUCCESS: fontTools.feaLib.parser.Parser accepts 'glyphSet' argument (instantiation succeeded).")
-        parser.parse()
-        print("SUCCESS: Dummy .fea file parsed.")
+    buf = io.StringIO(dummy_fea_content)
+    buf.name = "dummy.fea"
+    parser = Parser(buf, glyphSet=test_glyph_set, followIncludes=False)
+    print("SUCCESS: fontTools.feaLib.parser.Parser accepts 'glyphSet' argument (instantiation succeeded).")
+    parser.parse()
+    print("SUCCESS: Dummy .fea file parsed.")
     
 except TypeError as e:
     if "'glyphSet'" in str(e):
@@ -45,6 +44,3 @@ except TypeError as e:
         print(f"ERROR: A TypeError occurred, but not related to 'glyphSet': {e}")
 except Exception as e:
     print(f"An unexpected error occurred: {e}")
-finally:
-    if os.path.exists(dummy_fea_path):
-        os.remove(dummy_fea_path)